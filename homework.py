@@ -1,5 +1,78 @@
-from dataclasses import dataclass
-from typing import Dict, Type
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import string
+import sys
+import threading
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from itertools import islice
+from typing import (IO, Callable, Dict, Iterable, Iterator, List, Optional,
+                    Tuple, Type)
+
+# Размер блока чтения/записи сжатых потоков - 1 МиБ.
+CHUNK_SIZE = 1 << 20
+# Сколько блоков может ожидать в очереди между потоками.
+QUEUE_DEPTH = 4
+# Сигнатуры сжатых форматов и модули, которые их обрабатывают.
+COMPRESSION_MAGIC = (
+    (b'\x1f\x8b', gzip),
+    (b'BZh', bz2),
+    (b'\xfd7zXZ\x00', lzma),
+)
+# Расширения файлов, по которым выбирается формат сжатия.
+COMPRESSION_SUFFIXES = {
+    '.gz': gzip,
+    '.bz2': bz2,
+    '.xz': lzma,
+    '.lzma': lzma,
+}
+# Шаблоны информационного сообщения: (язык, система единиц) -> шаблон.
+MESSAGE_TEMPLATES: Dict[Tuple[str, str], str] = {
+    ('ru', 'metric'): (
+        'Тип тренировки: {training_type}; '
+        'Длительность: {duration:.3f} ч.; '
+        'Дистанция: {distance:.3f} км; '
+        'Ср. скорость: {speed:.3f} км/ч; '
+        'Потрачено ккал: {calories:.3f}.'
+    ),
+    ('ru', 'imperial'): (
+        'Тип тренировки: {training_type}; '
+        'Длительность: {duration:.3f} ч.; '
+        'Дистанция: {distance:.3f} миль; '
+        'Ср. скорость: {speed:.3f} миль/ч; '
+        'Потрачено ккал: {calories:.3f}.'
+    ),
+    ('en', 'metric'): (
+        'Training type: {training_type}; '
+        'Duration: {duration:.3f} h; '
+        'Distance: {distance:.3f} km; '
+        'Avg. speed: {speed:.3f} km/h; '
+        'Calories burned: {calories:.3f}.'
+    ),
+    ('en', 'imperial'): (
+        'Training type: {training_type}; '
+        'Duration: {duration:.3f} h; '
+        'Distance: {distance:.3f} mi; '
+        'Avg. speed: {speed:.3f} mph; '
+        'Calories burned: {calories:.3f}.'
+    ),
+}
+# Множители для перевода дистанции и скорости из км в единицы шаблона.
+UNIT_FACTORS = {
+    'metric': 1,
+    'imperial': 1 / 1.609344,
+}
+# Поля сообщения, которые пересчитываются в другие единицы.
+CONVERTED_FIELDS = ('distance', 'speed')
+# Подсказка по запуску обработки архива.
+USAGE = ('Использование: python homework.py <входной файл> <выходной файл> '
+         '[ru|en [metric|imperial]]')
+# Сколько сообщений отрисовывается за один вызов при записи в поток.
+MESSAGE_BATCH_SIZE = 1024
 
 
 @dataclass
@@ -12,14 +85,78 @@ class InfoMessage:
     speed: float          # Скорость (в км/ч)
     calories: float       # Килокалории
 
-    def get_message(self) -> str:
-        return (
-            f'Тип тренировки: {self.training_type}; '
-            f'Длительность: {self.duration:.3f} ч.; '
-            f'Дистанция: {self.distance:.3f} км; '
-            f'Ср. скорость: {self.speed:.3f} км/ч; '
-            f'Потрачено ккал: {self.calories:.3f}.'
-        )
+    def get_message(self, locale: str = 'ru',
+                    units: str = 'metric') -> str:
+        return _compile(locale, units)[0](self)
+
+
+def _to_fstring(template: str, factor: float) -> str:
+    """Перевести шаблон str.format в исходный код f-строки.
+
+    Поля шаблона становятся атрибутами `message`, дистанция
+    и скорость домножаются на FACTOR, если единицы не метрические.
+    """
+    message_fields = [field.name for field in fields(InfoMessage)]
+    parts = []
+    for literal, name, spec, conversion in string.Formatter().parse(
+            template):
+        parts.append(literal.replace('{', '{{').replace('}', '}}'))
+        if name is None:
+            continue
+        if name not in message_fields:
+            raise ValueError(f"Неизвестное поле шаблона: {name!r}")
+        if '{' in spec:
+            raise ValueError(f"Вложенные поля не поддерживаются: {spec!r}")
+        expression = f'message.{name}'
+        if factor != 1 and name in CONVERTED_FIELDS:
+            expression = f'({expression} * FACTOR)'
+        if conversion:
+            expression += '!' + conversion
+        if spec:
+            expression += ':' + spec
+        parts.append('{' + expression + '}')
+    return 'f' + repr(''.join(parts))
+
+
+@lru_cache(maxsize=None)
+def _compile(locale: str, units: str) -> Tuple[
+        Callable[[InfoMessage], str],
+        Callable[[Iterable[InfoMessage]], List[str]]]:
+    """Скомпилировать шаблон в функции отрисовки одного сообщения
+    и пачки сообщений."""
+    if (locale, units) not in MESSAGE_TEMPLATES:
+        raise ValueError(f"Шаблон для {locale}/{units} не найден")
+    template = MESSAGE_TEMPLATES[locale, units]
+    factor = UNIT_FACTORS[units]
+    code = _to_fstring(template, factor)
+    try:
+        render, render_batch = eval(
+            f'(lambda message: {code}, '
+            f'lambda messages: [{code} for message in messages])',
+            {'FACTOR': factor})
+        # ошибки формата должны проявиться сейчас, а не при отрисовке
+        render(InfoMessage('Training', 1.0, 1.0, 1.0, 1.0))
+    except (SyntaxError, TypeError, ValueError) as exc:
+        raise ValueError(
+            f"Некорректный шаблон {locale}/{units}: {exc}") from exc
+    return render, render_batch
+
+
+def compile_template(locale: str = 'ru',
+                     units: str = 'metric') -> Callable[[InfoMessage], str]:
+    """Скомпилировать шаблон сообщения в функцию отрисовки.
+
+    Шаблон переводится в f-строку один раз, результат кэшируется
+    для каждой пары язык/единицы.
+    """
+    return _compile(locale, units)[0]
+
+
+def render_messages(messages: Iterable[InfoMessage],
+                    locale: str = 'ru',
+                    units: str = 'metric') -> List[str]:
+    """Отрисовать пачку сообщений одним вызовом."""
+    return _compile(locale, units)[1](messages)
 
 
 @dataclass
@@ -206,6 +343,218 @@ def read_package(workout_type: str, data: list) -> Training:
     return workout[workout_type](*data)
 
 
+class _PrefetchReader(io.RawIOBase):
+    """Поток чтения, распаковка в котором идёт в фоновом потоке.
+
+    Фоновый поток читает распакованные данные блоками по CHUNK_SIZE
+    и складывает их в очередь, откуда их забирает readinto().
+    """
+
+    def __init__(self, source: IO[bytes]) -> None:
+        self._source = source
+        self._chunks: queue.Queue = queue.Queue(QUEUE_DEPTH)
+        self._buffer = memoryview(b'')
+        self._error: Optional[BaseException] = None
+        self._eof = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+
+    def _pump(self) -> None:
+        try:
+            chunk = self._source.read(CHUNK_SIZE)
+            while chunk and not self._stop.is_set():
+                self._chunks.put(chunk)
+                chunk = self._source.read(CHUNK_SIZE)
+        except BaseException as exc:
+            self._error = exc
+        # пустой блок означает конец потока
+        self._chunks.put(b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._buffer:
+            if self._eof:
+                return 0
+            chunk = self._chunks.get()
+            if not chunk:
+                self._eof = True
+                if self._error is not None:
+                    raise self._error
+                return 0
+            self._buffer = memoryview(chunk)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            # освобождаем очередь, чтобы фоновый поток не завис на put()
+            while self._thread.is_alive():
+                try:
+                    self._chunks.get_nowait()
+                except queue.Empty:
+                    self._thread.join(0.01)
+            self._source.close()
+        super().close()
+
+
+class _BackgroundWriter(io.RawIOBase):
+    """Поток записи, сжатие в котором идёт в фоновом потоке.
+
+    Блоки, накопленные BufferedWriter, передаются через очередь
+    фоновому потоку, который и вызывает кодек.
+    """
+
+    def __init__(self, target: IO[bytes]) -> None:
+        self._target = target
+        self._chunks: queue.Queue = queue.Queue(QUEUE_DEPTH)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+
+    def _pump(self) -> None:
+        chunk = self._chunks.get()
+        while chunk is not None:
+            if self._error is None:
+                try:
+                    self._target.write(chunk)
+                except BaseException as exc:
+                    self._error = exc
+            chunk = self._chunks.get()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self._error is not None:
+            raise self._error
+        chunk = bytes(data)
+        self._chunks.put(chunk)
+        return len(chunk)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._chunks.put(None)
+            self._thread.join()
+            self._target.close()
+        finally:
+            super().close()
+        if self._error is not None:
+            raise self._error
+
+
+def _detect_codec(path: str):
+    """Определить формат сжатия файла по сигнатуре или расширению."""
+    with open(path, 'rb') as file:
+        head = file.read(6)
+    for magic, codec in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return codec
+    # у формата .lzma (LZMA_Alone) нет сигнатуры
+    if path.endswith('.lzma'):
+        return lzma
+    return None
+
+
+def _codec_for_path(path: str):
+    """Определить формат сжатия по расширению файла."""
+    for suffix, codec in COMPRESSION_SUFFIXES.items():
+        if path.endswith(suffix):
+            return codec
+    return None
+
+
+def open_stream(path: str, mode: str = 'r') -> IO[str]:
+    """Открыть текстовый поток, прозрачно обрабатывая сжатие.
+
+    При чтении формат (gzip, bz2, lzma) определяется по содержимому
+    файла, при записи - по расширению. Сжатые потоки читаются
+    и пишутся блоками по CHUNK_SIZE, работа кодека вынесена
+    в фоновый поток.
+    """
+    if mode not in ('r', 'w'):
+        raise ValueError(f"Режим {mode!r} не поддерживается")
+    if mode == 'r':
+        codec = _detect_codec(path)
+    else:
+        codec = _codec_for_path(path)
+    if codec is None:
+        return open(path, mode, encoding='utf-8', buffering=CHUNK_SIZE)
+    if mode == 'r':
+        buffered: IO[bytes] = io.BufferedReader(
+            _PrefetchReader(codec.open(path, 'rb')), CHUNK_SIZE)
+    else:
+        options = {}
+        if path.endswith('.lzma'):
+            options['format'] = lzma.FORMAT_ALONE
+        buffered = io.BufferedWriter(
+            _BackgroundWriter(codec.open(path, 'wb', **options)),
+            CHUNK_SIZE)
+    return io.TextIOWrapper(buffered, encoding='utf-8')
+
+
+def _parse_number(value: str) -> float:
+    """Преобразовать показание датчика в int или float."""
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def read_packages(stream: Iterable[str]) -> Iterator[Tuple[str, list]]:
+    """Прочитать пакеты датчиков из текстового потока.
+
+    Каждая строка - код тренировки и показания через пробел,
+    например: SWM 720 1 80 25 40. Пустые строки пропускаются.
+    """
+    for line in stream:
+        fields = line.split()
+        if fields:
+            yield fields[0], [_parse_number(value) for value in fields[1:]]
+
+
+def write_messages(stream: IO[str], messages: Iterable[InfoMessage],
+                   locale: str = 'ru', units: str = 'metric') -> None:
+    """Записать сообщения о тренировках в поток, по одному на строку.
+
+    Сообщения отрисовываются пачками по MESSAGE_BATCH_SIZE.
+    """
+    messages = iter(messages)
+    batch = list(islice(messages, MESSAGE_BATCH_SIZE))
+    while batch:
+        stream.write('\n'.join(render_messages(batch, locale, units)) + '\n')
+        batch = list(islice(messages, MESSAGE_BATCH_SIZE))
+
+
+def process_archive(input_path: str, output_path: str,
+                    locale: str = 'ru', units: str = 'metric') -> None:
+    """Обработать архив пакетов и записать сообщения в файл.
+
+    Оба файла могут быть сжаты gzip, bz2 или lzma. Если обработка
+    прервалась ошибкой, недописанный выходной файл удаляется.
+    """
+    # проверяем шаблон до того, как открывать файлы
+    compile_template(locale, units)
+    with open_stream(input_path) as source:
+        target = open_stream(output_path, 'w')
+        try:
+            with target:
+                write_messages(target, (
+                    read_package(workout_type, data).show_training_info()
+                    for workout_type, data in read_packages(source)),
+                    locale, units)
+        except BaseException:
+            os.remove(output_path)
+            raise
+
+
 def main(training: Training) -> None:
     """Главная функция."""
     info = training.show_training_info()
@@ -213,6 +562,12 @@ def main(training: Training) -> None:
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        if not 3 <= len(sys.argv) <= 5:
+            sys.exit(USAGE)
+        process_archive(*sys.argv[1:])
+        sys.exit()
+
     packages = [
         ('SWM', [720, 1, 80, 25, 40]),
         ('RUN', [15000, 1, 75]),
@@ -1,7 +1,10 @@
+import gzip
+import os
 import re
 import pytest
 import types
 import inspect
+import threading
 from conftest import Capturing
 
 try:
@@ -419,3 +422,177 @@ def test_main_output(input_data, expected):
     assert get_message_output == expected, (
         'Метод `main` должен печатать результат в консоль.\n'
     )
+
+
+@pytest.mark.parametrize('suffix', ['.txt', '.gz', '.bz2', '.xz', '.lzma'])
+def test_open_stream_roundtrip(tmp_path, suffix):
+    path = str(tmp_path / f'packages{suffix}')
+    text = 'SWM 720 1 80 25 40\n' * 1000
+    with homework.open_stream(path, 'w') as stream:
+        stream.write(text)
+    with homework.open_stream(path) as stream:
+        assert stream.read() == text, (
+            'Функция `open_stream` должна прозрачно '
+            f'читать и записывать файлы `{suffix}`.'
+        )
+
+
+def test_open_stream_detects_codec(tmp_path):
+    path = tmp_path / 'packages.dat'
+    path.write_bytes(gzip.compress('RUN 15000 1 75\n'.encode()))
+    with homework.open_stream(str(path)) as stream:
+        assert stream.read() == 'RUN 15000 1 75\n', (
+            'Функция `open_stream` должна определять сжатие по содержимому.'
+        )
+
+
+def test_process_archive(tmp_path):
+    source = str(tmp_path / 'packages.txt.bz2')
+    target = str(tmp_path / 'messages.txt.gz')
+    with homework.open_stream(source, 'w') as stream:
+        stream.write('SWM 720 1 80 25 40\n\nRUN 1206 12 6\n')
+    homework.process_archive(source, target)
+    with homework.open_stream(target) as stream:
+        assert stream.read().splitlines() == [
+            'Тип тренировки: Swimming; '
+            'Длительность: 1.000 ч.; '
+            'Дистанция: 0.994 км; '
+            'Ср. скорость: 1.000 км/ч; '
+            'Потрачено ккал: 336.000.',
+            'Тип тренировки: Running; '
+            'Длительность: 12.000 ч.; '
+            'Дистанция: 0.784 км; '
+            'Ср. скорость: 0.065 км/ч; '
+            'Потрачено ккал: 12.812.',
+        ]
+
+
+def test_process_archive_removes_output_on_error(tmp_path):
+    source = str(tmp_path / 'packages.txt')
+    target = tmp_path / 'messages.txt.gz'
+    with open(source, 'w', encoding='utf-8') as stream:
+        stream.write('RUN 15000 1 75\nFOO 1 2\n')
+    with pytest.raises(ValueError):
+        homework.process_archive(source, str(target))
+    assert not target.exists(), (
+        'Функция `process_archive` должна удалять '
+        'недописанный выходной файл при ошибке.'
+    )
+
+
+def test_open_stream_truncated(tmp_path):
+    path = tmp_path / 'packages.txt.gz'
+    data = gzip.compress(os.urandom(3 * homework.CHUNK_SIZE))
+    path.write_bytes(data[:len(data) // 2])
+    with homework.open_stream(str(path)) as stream:
+        with pytest.raises(EOFError):
+            stream.buffer.read()
+
+
+def test_open_stream_early_close(tmp_path):
+    path = str(tmp_path / 'packages.txt.gz')
+    with homework.open_stream(path, 'w') as stream:
+        for _ in range(20):
+            stream.write(os.urandom(homework.CHUNK_SIZE // 2).hex() + '\n')
+    stream = homework.open_stream(path)
+    stream.readline()
+    closer = threading.Thread(target=stream.close, daemon=True)
+    closer.start()
+    closer.join(5)
+    assert not closer.is_alive() and stream.closed, (
+        'Закрытие недочитанного потока не должно зависать.'
+    )
+
+
+def test_background_writer_error():
+    class BrokenTarget:
+        def write(self, data):
+            raise OSError('диск заполнен')
+
+        def close(self):
+            pass
+
+    writer = homework._BackgroundWriter(BrokenTarget())
+    writer.write(b'data')
+    with pytest.raises(OSError):
+        writer.close()
+    assert writer.closed
+
+
+@pytest.mark.parametrize('locale, units, expected', [
+    ('en', 'metric',
+        'Training type: Running; '
+        'Duration: 1.000 h; '
+        'Distance: 1.609 km; '
+        'Avg. speed: 1.609 km/h; '
+        'Calories burned: 10.000.'),
+    ('en', 'imperial',
+        'Training type: Running; '
+        'Duration: 1.000 h; '
+        'Distance: 1.000 mi; '
+        'Avg. speed: 1.000 mph; '
+        'Calories burned: 10.000.'),
+    ('ru', 'imperial',
+        'Тип тренировки: Running; '
+        'Длительность: 1.000 ч.; '
+        'Дистанция: 1.000 миль; '
+        'Ср. скорость: 1.000 миль/ч; '
+        'Потрачено ккал: 10.000.'),
+])
+def test_InfoMessage_get_message_locale(locale, units, expected):
+    info_message = homework.InfoMessage('Running', 1, 1.609344, 1.609344, 10)
+    assert info_message.get_message(locale, units) == expected, (
+        'Метод `get_message` должен учитывать язык и систему единиц.'
+    )
+
+
+def test_compile_template():
+    renderer = homework.compile_template('ru')
+    assert renderer is homework.compile_template('ru', 'metric'), (
+        'Функция `compile_template` должна кэшировать шаблоны.'
+    )
+    assert renderer is homework.compile_template(units='metric'), (
+        'Функция `compile_template` должна кэшировать шаблоны.'
+    )
+    with pytest.raises(ValueError):
+        homework.compile_template('de')
+
+
+@pytest.mark.parametrize('template, expected', [
+    ('{training_type!r}: {calories:,.1f}', "'Running': 1,234.5"),
+    ('{training_type:>8}|{distance:.1%}', ' Running|150.0%'),
+])
+def test_compile_template_format_spec(monkeypatch, template, expected):
+    locale = f'test-{len(template)}-{expected}'
+    monkeypatch.setitem(
+        homework.MESSAGE_TEMPLATES, (locale, 'metric'), template)
+    info_message = homework.InfoMessage('Running', 1, 1.5, 1, 1234.5)
+    assert info_message.get_message(locale) == expected, (
+        'Шаблон должен поддерживать спецификации формата `str.format`.'
+    )
+
+
+@pytest.mark.parametrize('template', [
+    '{training_type:.3f}',
+    '{pace:.3f}',
+    '{distance:{width}}',
+    '{0}',
+])
+def test_compile_template_invalid(monkeypatch, template):
+    locale = f'invalid-{template}'
+    monkeypatch.setitem(
+        homework.MESSAGE_TEMPLATES, (locale, 'metric'), template)
+    with pytest.raises(ValueError):
+        homework.compile_template(locale)
+
+
+def test_render_messages():
+    messages = [
+        homework.InfoMessage('Swimming', 1, 75, 1, 80),
+        homework.InfoMessage('Running', 4, 20, 4, 20),
+    ]
+    assert homework.render_messages(messages) == [
+        message.get_message() for message in messages
+    ], (
+        'Функция `render_messages` должна отрисовывать пачку сообщений.'
+    )